@@ -1,20 +1,64 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
 import argparse
 import os
 import sys
 
-from gitsum.status import RepoStatus
+from gitsum.fetch_stamps import FetchStamps
+from gitsum.status import RepoStatus, get_status, get_status_git
 import gitsum
+import gitsum.output as output
 import gitsum.search as search
 
 
+def _int_at_least(value: str, min: int, description: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = min - 1
+    if n < min:
+        raise argparse.ArgumentTypeError(f"expected a {description} integer but got '{value}'")
+    return n
+
+
+def _positive_int(value: str) -> int:
+    return _int_at_least(value, 1, "positive")
+
+
+def _non_negative_int(value: str) -> int:
+    return _int_at_least(value, 0, "non-negative")
+
+
+def _default_jobs(fetch: bool) -> int:
+    # Fetching is network-bound, so it is worth having many more threads than CPUs
+    cpu_count = os.cpu_count() or 1
+    return min(32, cpu_count * 4) if fetch else cpu_count
+
+
+def _get_status(repo_path: str, name: str, args: argparse.Namespace, fetch_stamps: Optional[FetchStamps]) -> Optional[RepoStatus]:
+    if args.backend == "git":
+        return get_status_git(repo_path, name, args.fetch, args.cache_graph, fetch_stamps, check_changes=not args.fast)
+    # Open the repo here rather than during the search so that we don't keep every repo open at once
+    repo = search.open_repo(repo_path, name)
+    if repo is None:
+        return None
+    return get_status(repo, repo_path, name, args.fetch, args.cache_graph, fetch_stamps, check_changes=not args.fast)
+
+
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         prog="gitsum",
         description="View a summary of statuses for multiple Git repositories."
     )
 
+    parser.add_argument("--backend", choices=["libgit2", "git"], default="libgit2", help="how to read the repositories: with libgit2 (default) or by running git")
+    parser.add_argument("--cache-graph", action="store_true", help="write a commit-graph file in each repository to speed up future runs (requires git)")
+    parser.add_argument("-e", "--exclude", action="append", default=[], metavar="NAME", help="do not search directories with the given name (can be used multiple times)")
+    parser.add_argument("--fast", action="store_true", help="do not check for local changes (only show the status relative to the upstream branch)")
     parser.add_argument("-f", "--fetch", action="store_true", help="fetch before getting status")
+    parser.add_argument("--fetch-ttl", type=_non_negative_int, default=0, metavar="SECONDS", help="when fetching, skip repositories that were fetched less than SECONDS ago (default: 0)")
+    parser.add_argument("-j", "--jobs", type=_positive_int, metavar="N", help="number of repositories to process in parallel (default: based on the number of CPUs)")
     parser.add_argument("-o", "--outside-files", action="store_true", help="list files and directories that are not inside a Git repository")
     parser.add_argument("-O", "--only-outside-files", action="store_true", help="list files and directories that are not inside a Git repository and exit")
     parser.add_argument("-V", "--version", action="store_true", help="display the version number and exit")
@@ -28,19 +72,43 @@ def _show_git_summary(args: argparse.Namespace) -> None:
         print(f"gitsum v{gitsum_version}")
         sys.exit(0)
 
-    cwd = Path(os.getcwd())
-    repos = search.find_git_repos(cwd, args.outside_files or args.only_outside_files)
-    if args.only_outside_files:
-        return
+    jobs = args.jobs or _default_jobs(args.fetch)
+    # Resolve the working directory once rather than separately for each repo
+    cwd = Path(os.getcwd()).resolve()
+    fetch_stamps = FetchStamps(args.fetch_ttl) if args.fetch and args.fetch_ttl > 0 else None
+    # The same threads are used to search for repos and get their statuses, so that
+    # each repo's status can be computed while the search continues
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending_statuses: List[Tuple[str, Future]] = []
+
+        def start_status(repo_path: str) -> None:
+            name = output.get_repo_name(repo_path, cwd)
+            pending_statuses.append((name, executor.submit(_get_status, repo_path, name, args, fetch_stamps)))
+
+        try:
+            list_outside_files = args.outside_files or args.only_outside_files
+            on_repo_found = (lambda _: None) if args.only_outside_files else start_status
+            repos = search.find_git_repos(cwd, list_outside_files, executor, args.exclude, on_repo_found)
+            if args.only_outside_files:
+                return
 
-    num_repos = len(repos)
-    print(f"Found {num_repos} Git {'repository' if num_repos == 1 else 'repositories'}.")
-    statuses = [RepoStatus(r, args.fetch) for r in repos]
+            num_repos = len(repos)
+            print(f"Found {num_repos} Git {'repository' if num_repos == 1 else 'repositories'}.")
+            pending_statuses.sort(key=lambda x: x[0])
+            results = (future.result() for (_, future) in pending_statuses)
+            statuses = [s for s in results if s is not None]
+        except KeyboardInterrupt:
+            # Otherwise the executor would get every remaining status before exiting
+            for (_, future) in pending_statuses:
+                future.cancel()
+            raise
+    if fetch_stamps:
+        fetch_stamps.save()
     if statuses:
-        name_width = max([len(s.name) for s in statuses])
-        head_width = max([len(s.head) for s in statuses])
-        statuses.sort(key=lambda s: s.name)
-        [print(s.to_string(name_width, head_width)) for s in statuses]
+        name_width = max(len(s.name) for s in statuses)
+        head_width = max(len(s.head) for s in statuses)
+        # Write everything at once rather than calling print() for each repo
+        sys.stdout.write("".join(s.to_string(name_width, head_width) + "\n" for s in statuses))
 
 
 def main() -> None:
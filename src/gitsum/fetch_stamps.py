@@ -0,0 +1,60 @@
+"""
+Module for remembering when each repository was last fetched.
+"""
+from typing import Dict
+import json
+import os
+import threading
+import time
+
+import gitsum.output as output
+
+
+def _default_path() -> str:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_dir, "gitsum", "fetch-stamps.json")
+
+
+class FetchStamps:
+    """
+    Timestamps of the last successful fetch of each repository, so that repositories fetched less than `ttl` seconds ago can be skipped.
+
+    Stamps can be read and recorded from multiple threads. Call `save()` once at the end to write them to disk.
+    """
+
+    def __init__(self, ttl: int, path: str = "") -> None:
+        self._ttl = ttl
+        self._path = path or _default_path()
+        self._lock = threading.Lock()
+        self._stamps = self._load()
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            with open(self._path) as f:
+                stamps = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(stamps, dict):
+            return {}
+        # Ignore anything that isn't a timestamp rather than failing later on
+        return {
+            path: stamp for (path, stamp) in stamps.items()
+            if isinstance(stamp, (int, float)) and not isinstance(stamp, bool)
+        }
+
+    def is_fresh(self, repo_path: str) -> bool:
+        with self._lock:
+            stamp = self._stamps.get(repo_path)
+        return stamp is not None and time.time() - stamp < self._ttl
+
+    def record(self, repo_path: str) -> None:
+        with self._lock:
+            self._stamps[repo_path] = time.time()
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            with open(self._path, "w") as f:
+                json.dump(self._stamps, f)
+        except OSError:
+            output.warn(f"Failed to save fetch times to '{self._path}'")
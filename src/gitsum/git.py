@@ -0,0 +1,67 @@
+"""
+Module for running the Git command-line tool.
+"""
+from typing import Dict, List, Optional
+import os
+import subprocess
+
+
+def run_bytes(repo_path: str, args: List[str], extra_env: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+    """
+    Same as `run()`, but returns the raw output without decoding it.
+    """
+    # Fail instead of prompting for credentials, since gitsum runs many commands in the background
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0", **(extra_env or {})}
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path] + args,
+            capture_output=True,
+            stdin=subprocess.DEVNULL,
+            env=env,
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def run(repo_path: str, args: List[str], extra_env: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    Runs the given Git command in the given repository (or Git directory) and returns its output, or `None` if the command failed or Git is not installed.
+    """
+    output = run_bytes(repo_path, args, extra_env)
+    if output is None:
+        return None
+    # Paths and ref names are not necessarily UTF-8
+    return output.decode(errors="surrogateescape")
+
+
+def fetch(repo_path: str, remote_name: str) -> bool:
+    """
+    Fetches the given remote. Returns `True` if successful.
+    """
+    extra_env = {}
+    # Have ssh fail rather than ask for a password, unless the user chose their own ssh command
+    if (
+        "GIT_SSH_COMMAND" not in os.environ
+        and "GIT_SSH" not in os.environ
+        and run(repo_path, ["config", "core.sshCommand"]) is None
+    ):
+        extra_env["GIT_SSH_COMMAND"] = "ssh -o BatchMode=yes"
+    return run(repo_path, ["fetch", "--quiet", remote_name], extra_env) is not None
+
+
+def has_commit_graph(git_dir: str) -> bool:
+    info_dir = os.path.join(git_dir, "objects", "info")
+    return (
+        os.path.isfile(os.path.join(info_dir, "commit-graph"))
+        or os.path.isfile(os.path.join(info_dir, "commit-graphs", "commit-graph-chain"))
+    )
+
+
+def write_commit_graph(repo_path: str) -> bool:
+    """
+    Adds any new reachable commits to the repo's commit-graph file. Returns `True` if successful.
+    """
+    return run(repo_path, ["commit-graph", "write", "--reachable", "--split"]) is not None
@@ -6,14 +6,13 @@ import os
 import sys
 
 
-def get_repo_name(path_str: str) -> str:
+def get_repo_name(path_str: str, working_dir: Path) -> str:
     """
-    Returns the path to the given repo, relative to the current working
-    directory. The path will always end with the repo name (e.g., "../repo"
-    instead of just ".").
+    Returns the path to the given repo, relative to the given working
+    directory (which must already be resolved). The path will always end with
+    the repo name (e.g., "../repo" instead of just ".").
     """
     repo_path = Path(path_str).resolve()
-    working_dir = Path(os.getcwd()).resolve()
     # Remove .git folder
     if repo_path.match(".git"):
         repo_path = repo_path.parent
@@ -1,57 +1,176 @@
 """
 Module for finding Git repositories.
 """
+from concurrent.futures import Executor, Future
+from itertools import chain
 from pathlib import Path
-from typing import List, Tuple, TypeVar
+from queue import SimpleQueue
+from typing import AbstractSet, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import os
+import sys
 import pygit2  # type: ignore
 
 import gitsum.output as output
 
 
-T = TypeVar("T")
+# Directories that are never searched for repositories (in addition to any given by the user). They are still listed as outside files.
+# These should never contain repos: `vendor` is not included since dependencies are sometimes vendored as Git repos.
+_EXCLUDED_DIRS = frozenset({".git", ".tox", ".venv", "__pycache__", "node_modules"})
 
+# Entries that are always present in a bare repository
+_BARE_REPO_MARKERS = frozenset({"HEAD", "objects", "refs"})
 
-def _flatten(l: List[List[T]]) -> List[T]:
-    return [x for sublist in l for x in sublist]
 
+def _is_repo_dir(entries: List[os.DirEntry]) -> bool:
+    names = {e.name for e in entries}
+    return ".git" in names or _BARE_REPO_MARKERS <= names
 
-def _do_get_git_repos(dir: Path) -> Tuple[List[pygit2.Repository], List[Path]]:
-    if not os.path.isdir(dir):
-        return ([], [dir])
 
-    repo_path = pygit2.discover_repository(str(dir))
+def open_repo(repo_path: str, repo_name: str) -> Optional[pygit2.Repository]:
+    """
+    Opens the repository at the given path (as returned by `find_git_repos()`).
+    """
+    try:
+        return pygit2.Repository(repo_path)
+    # Somehow this happens for one of my local repos (but not for copies of that repo!).
+    # I have no idea what to do about it other than catching the exception.
+    except pygit2.GitError:
+        output.warn(f"Failed to load repository '{repo_name}'")
+        return None
+
+
+def _mark_containing(path: str, root: str, containing: Set[str]) -> None:
+    """
+    Marks the given directory and all its ancestors up to the root as containing a repo.
+    """
+    while path not in containing:
+        containing.add(path)
+        if path == root:
+            break
+        path = os.path.dirname(path)
+
+
+# Maximum number of directories scanned by one task. Scanning many directories per task keeps the overhead of the
+# thread pool low, while the directories left over are handed back so that large trees are still split between threads.
+_DIRS_PER_TASK = 128
+
+# Path to a scanned directory, whether it is a repo, and its children (if needed) along with whether each is a directory
+_ScannedDir = Tuple[str, bool, List[Tuple[str, bool]]]
+
+
+def _scan_dirs(top: str, root: str, excluded_dirs: AbstractSet[str], list_outside_files: bool) -> Tuple[List[_ScannedDir], List[str]]:
+    """
+    Scans the given directory and its subdirectories (depth first, without going into repos), stopping after `_DIRS_PER_TASK` directories.
+    Returns the scanned directories and the directories that are left to scan.
+    """
+    stack = [top]
+    scanned: List[_ScannedDir] = []
+    while stack and len(scanned) < _DIRS_PER_TASK:
+        dir = stack.pop()
+        with os.scandir(dir) as it:
+            entries = list(it)
+        is_repo = dir != root and _is_repo_dir(entries)
+        children = [(e.path, e.is_dir()) for e in entries] if list_outside_files and not is_repo else []
+        scanned.append((dir, is_repo, children))
+        if not is_repo:
+            stack.extend(e.path for e in entries if e.is_dir(follow_symlinks=False) and e.name not in excluded_dirs)
+    return (scanned, stack)
+
+
+def _get_outside_files(root: str, containing: Set[str], children: Dict[str, List[Tuple[str, bool]]]) -> Iterator[Tuple[str, bool]]:
+    """
+    Yields the path to each outside file and whether it is a directory.
+    """
+    # If there are no Git repos within a directory, just say that the entire directory is an outside file
+    if root not in containing:
+        yield (root, True)
+        return
+    searched_children = chain.from_iterable(children[dir] for dir in containing if dir in children)
+    yield from (child for child in searched_children if child[0] not in containing)
+
+
+def _do_get_git_repos(
+    root: str,
+    executor: Executor,
+    list_outside_files: bool,
+    excluded_dirs: AbstractSet[str],
+    on_repo_found: Callable[[str], None],
+) -> Tuple[List[str], Iterator[Tuple[str, bool]]]:
+    # The root might be inside a repo, in which case we need to search the parent directories
+    repo_path = pygit2.discover_repository(root)
     if repo_path:
-        try:
-            return ([pygit2.Repository(repo_path)], [])
-        # Somehow this happens for one of my local repos (but not for copies of that repo!).
-        # I have no idea what to do about it other than catching the exception.
-        except pygit2.GitError:
-            repo_name = output.get_repo_name(repo_path)
-            output.warn(f"Failed to load repository '{repo_name}'")
-            return ([], [dir])
+        # Return the working tree rather than the .git/ folder, like for the other repos
+        repo_path = repo_path.rstrip("/\\")
+        if os.path.basename(repo_path) == ".git":
+            repo_path = os.path.dirname(repo_path)
+        on_repo_found(repo_path)
+        return ([repo_path], iter([]))
+
+    repos: List[str] = []
+    # Directories which are or contain a Git repo
+    containing: Set[str] = set()
+    # Children of each directory that was searched (excluding repos). Only needed to list outside files.
+    children: Dict[str, List[Tuple[str, bool]]] = {}
+    # Directories are scanned in parallel since this is mostly waiting on the file system.
+    # All the bookkeeping happens on this thread.
+    # Finished tasks are put in a queue rather than using wait(), which checks every pending task each time
+    finished: "SimpleQueue[Future]" = SimpleQueue()
+    scans: List[Future] = []
+
+    def start_scan(dir: str) -> None:
+        scan = executor.submit(_scan_dirs, dir, root, excluded_dirs, list_outside_files)
+        scan.add_done_callback(finished.put)
+        scans.append(scan)
+
+    start_scan(root)
+    num_pending = 1
+    try:
+        while num_pending > 0:
+            (scanned, left_to_scan) = finished.get().result()
+            num_pending -= 1
+            for (dir, is_repo, dir_children) in scanned:
+                if is_repo:
+                    repos.append(dir)
+                    _mark_containing(dir, root, containing)
+                    on_repo_found(dir)
+                elif list_outside_files:
+                    children[dir] = dir_children
+            for dir in left_to_scan:
+                start_scan(dir)
+            num_pending += len(left_to_scan)
+    except BaseException:
+        # Don't leave the executor to finish scanning (e.g., after Ctrl-C)
+        for scan in scans:
+            scan.cancel()
+        raise
 
-    results = [_do_get_git_repos(subdir) for subdir in dir.iterdir()]
-    # If there are no Git repos within this directory, just say that this entire directory is an outside file
-    repos = _flatten([repos for (repos, _) in results])
-    outside_files = _flatten([outside_files for (_, outside_files) in results])
-    if len(repos) != 0:
-        return (repos, outside_files)
-    else:
-        return (repos, [dir])
+    return (repos, _get_outside_files(root, containing, children))
 
 
-def find_git_repos(dir: Path, list_outside_files: bool) -> List[pygit2.Repository]:
+def find_git_repos(
+    dir: Path,
+    list_outside_files: bool,
+    executor: Executor,
+    exclude: Iterable[str] = (),
+    on_repo_found: Callable[[str], None] = lambda _: None,
+) -> List[str]:
     """
-    Recursively searches for git repos starting in (and including) the given directory.
+    Recursively searches for git repos starting in (and including) the given (resolved) directory, scanning directories with the given executor.
+    Directories whose name is in `exclude` are skipped (along with some defaults such as `node_modules`).
+    `on_repo_found` is called (on this thread) with the path to each repo as soon as it is found, so that work on that repo can start while the search continues.
+    Returns the path to each repo. The repos are not opened, so use `open_repo()` to get the `pygit2.Repository`.
     """
-    (repos, outside_files) = _do_get_git_repos(dir)
+    excluded_dirs = _EXCLUDED_DIRS.union(exclude)
+    root = str(dir)
+    (repos, outside_files) = _do_get_git_repos(root, executor, list_outside_files, excluded_dirs, on_repo_found)
 
     if list_outside_files:
-        outside_files.sort()
-        for f in outside_files:
-            relative_path = f.relative_to(dir).as_posix()
-            path_str = relative_path + "/" if f.is_dir() else relative_path
-            print(f"OUTSIDE: {path_str}")
+        # Sort by path component (like pathlib does) so that "a/b" comes before "a-b"
+        lines = []
+        for (f, is_dir) in sorted(outside_files, key=lambda x: os.path.normcase(x[0]).split(os.sep)):
+            relative_path = os.path.relpath(f, root).replace(os.sep, "/")
+            path_str = relative_path + "/" if is_dir else relative_path
+            lines.append(f"OUTSIDE: {path_str}\n")
+        sys.stdout.write("".join(lines))
 
     return repos
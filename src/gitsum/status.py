@@ -1,14 +1,24 @@
 """
 Module for finding the status of a Git repository.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import re
 import pygit2  # type: ignore
 
+from gitsum.fetch_stamps import FetchStamps
+import gitsum.git as git
 import gitsum.output as output
 
 
-@dataclass
+@dataclass(frozen=True)
 class RepoStatus:
+    # Declared by hand since dataclass(slots=True) needs Python 3.10
+    __slots__ = (
+        "name", "head", "is_local", "has_changes", "branch_has_upstream", "local_ahead", "local_behind",
+        "_flag", "_local_status", "_remote_status",
+    )
+
     name: str
     head: str
     is_local: bool
@@ -16,36 +26,18 @@ class RepoStatus:
     branch_has_upstream: bool
     local_ahead: int
     local_behind: int
+    # Parts of the output that do not depend on the column widths, computed once in __post_init__().
+    # At runtime, a field() here would conflict with the slot of the same name, so only the type checker sees them.
+    if TYPE_CHECKING:
+        _flag: str = field(init=False, repr=False, compare=False)
+        _local_status: str = field(init=False, repr=False, compare=False)
+        _remote_status: str = field(init=False, repr=False, compare=False)
 
-    def __init__(self, repo: pygit2.Repository, fetch: bool) -> None:
-        self.name = output.get_repo_name(repo.path)
-        self.branch_has_upstream = False
-        (self.local_ahead, self.local_behind) = (0, 0)
-        if repo.head_is_unborn:
-            self.head = "(no commits)"
-        elif repo.head_is_detached:
-            self.head = f"({repo.head.target.hex[:6]})"  # type: ignore
-        else:
-            self.head = repo.head.shorthand
-            local_branch = repo.lookup_branch(self.head)
-            if local_branch.upstream:
-                self.branch_has_upstream = True
-                if fetch:
-                    remote = repo.remotes[local_branch.upstream.remote_name]
-                    if not self._try_fetch(remote):
-                        output.warn(f"Failed to fetch repo '{self.name}'")
-                (self.local_ahead, self.local_behind) = repo.ahead_behind(local_branch.target, local_branch.upstream.target) # type: ignore
-        self.is_local = not len(repo.remotes) > 0
-        self.has_changes = len(repo.status()) > 0
-
-    @staticmethod
-    def _try_fetch(remote: pygit2.Remote) -> bool:
-        try:
-            remote.fetch()  # type: ignore
-            return True
-        except pygit2.GitError:
-            # TODO: Check credentials? Skip?
-            return False
+    def __post_init__(self) -> None:
+        # The dataclass is frozen, so the usual attribute assignment is not allowed
+        object.__setattr__(self, "_flag", "!" if not self._is_up_to_date() else " ")
+        object.__setattr__(self, "_local_status", "*" if self.has_changes else " ")
+        object.__setattr__(self, "_remote_status", self._get_remote_status())
 
     def _is_up_to_date(self) -> bool:
         return not self.has_changes and (
@@ -54,22 +46,188 @@ class RepoStatus:
             )
         )
 
-    def to_string(self, name_width: int, head_width: int) -> str:
-        flag = "!" if not self._is_up_to_date() else " "
-        name = f"{self.name:<{name_width}}"
-        head = f"{self.head:<{head_width}}"
-        local_status = "*" if self.has_changes else " "
+    def _get_remote_status(self) -> str:
         if self.is_local:
-            remote_status = "local repo"
+            return "local repo"
         elif not self.branch_has_upstream:
-            remote_status = "local branch"
-        else:
-            remote_status = ""
-            if self.local_ahead > 0:
-                remote_status += f">{self.local_ahead} "
-            if self.local_behind > 0:
-                remote_status += f"<{self.local_behind}"
-        return f"{flag}  {name}  {head}  {local_status}  {remote_status}"
+            return "local branch"
+        ahead = f">{self.local_ahead} " if self.local_ahead > 0 else ""
+        behind = f"<{self.local_behind}" if self.local_behind > 0 else ""
+        return ahead + behind
+
+    def to_string(self, name_width: int, head_width: int) -> str:
+        return "  ".join((
+            self._flag,
+            self.name.ljust(name_width),
+            self.head.ljust(head_width),
+            self._local_status,
+            self._remote_status,
+        ))
 
     def __str__(self) -> str:
         return self.to_string(0, 0)
+
+
+def _read_refs(repo: pygit2.Repository, repo_path: str, name: str, fetch: bool, cache_graph: bool, fetch_stamps: Optional[FetchStamps]) -> Tuple[str, bool, bool, int, int]:
+    """
+    Returns the parts of the status that only depend on the repo's references and commits (i.e., everything except whether there are local changes).
+    """
+    branch_has_upstream = False
+    (local_ahead, local_behind) = (0, 0)
+    # Each property access goes through libgit2, so only do each one once
+    remotes = repo.remotes
+    if repo.head_is_unborn:
+        head_name = "(no commits)"
+    else:
+        head = repo.head
+        if repo.head_is_detached:
+            head_name = f"({head.target.raw[:3].hex()})"  # type: ignore
+        else:
+            head_name = head.shorthand
+            local_branch = repo.lookup_branch(head_name)
+            upstream = local_branch.upstream
+            if upstream:
+                branch_has_upstream = True
+                if fetch and not (fetch_stamps and fetch_stamps.is_fresh(repo_path)):
+                    remote = remotes[upstream.remote_name]
+                    if _try_fetch(remote):
+                        if fetch_stamps:
+                            fetch_stamps.record(repo_path)
+                        # The upstream reference may have moved
+                        upstream = local_branch.upstream
+                    else:
+                        output.warn(f"Failed to fetch repo '{name}'")
+                if cache_graph and not git.write_commit_graph(repo.path):
+                    output.warn(f"Failed to write commit-graph for repo '{name}'")
+                # HEAD points to the branch, so it already has the branch's target
+                (local_ahead, local_behind) = _ahead_behind(repo, head.target, upstream.target, cache_graph)  # type: ignore
+    return (head_name, not remotes, branch_has_upstream, local_ahead, local_behind)
+
+
+def _try_fetch(remote: pygit2.Remote) -> bool:
+    try:
+        remote.fetch()  # type: ignore
+        return True
+    except pygit2.GitError:
+        # TODO: Check credentials? Skip?
+        return False
+
+
+def _ahead_behind(repo: pygit2.Repository, local: pygit2.Oid, upstream: pygit2.Oid, use_graph: bool) -> Tuple[int, int]:
+    if local == upstream:
+        return (0, 0)
+    # With a commit-graph file, Git can count commits much faster than libgit2 (which doesn't use it).
+    # Only do this when asked to, since starting a process is slower than libgit2 for short histories.
+    if use_graph and git.has_commit_graph(repo.path):
+        counts = git.run(repo.path, ["rev-list", "--left-right", "--count", f"{local}...{upstream}"])
+        if counts is not None:
+            (ahead, behind) = counts.split()
+            return (int(ahead), int(behind))
+    return repo.ahead_behind(local, upstream)  # type: ignore
+
+
+def _has_changes(repo: pygit2.Repository) -> bool:
+    """
+    Equivalent to `len(repo.status()) > 0`. Checks for conflicts, then staged changes, then changes in the working tree, and returns as soon as one of these finds something.
+    Each check still computes its full diff, so this only saves time when there are conflicts or staged changes.
+    """
+    if repo.is_bare:
+        return False
+    index = repo.index
+    if index.conflicts:
+        return True
+    # Compare the index to HEAD first since this doesn't need to touch the working tree
+    if repo.head_is_unborn:
+        if len(index) > 0:
+            return True
+    elif len(index.diff_to_tree(repo.head.peel(pygit2.Tree))) > 0:  # type: ignore
+        return True
+    return len(index.diff_to_workdir(pygit2.GIT_DIFF_INCLUDE_UNTRACKED)) > 0  # type: ignore
+
+
+def get_status(repo: pygit2.Repository, repo_path: str, name: str, fetch: bool, cache_graph: bool, fetch_stamps: Optional[FetchStamps], check_changes: bool = True) -> RepoStatus:
+    (head, is_local, branch_has_upstream, local_ahead, local_behind) = _read_refs(repo, repo_path, name, fetch, cache_graph, fetch_stamps)
+    # This is the only part that needs to look at the working tree
+    has_changes = check_changes and _has_changes(repo)
+    return RepoStatus(name, head, is_local, has_changes, branch_has_upstream, local_ahead, local_behind)
+
+
+# Format for `git for-each-ref`: branch name (not `refname:short`, which can be ambiguous with tags), upstream branch, upstream remote, ahead/behind
+_BRANCH_FORMAT = "%(refname:lstrip=2)%00%(upstream)%00%(upstream:remotename)%00%(upstream:track,nobracket)"
+
+_AHEAD_REGEX = re.compile(r"ahead (\d+)")
+_BEHIND_REGEX = re.compile(r"behind (\d+)")
+
+
+def _get_current_branch_git(repo_path: str) -> Optional[List[str]]:
+    """
+    Returns the `_BRANCH_FORMAT` fields for the current branch, or `None` if HEAD is detached or unborn.
+    """
+    head_ref = git.run(repo_path, ["symbolic-ref", "--quiet", "HEAD"])
+    if not head_ref:
+        return None
+    # Only look up HEAD's branch, since computing ahead/behind for every branch can be slow
+    branch = git.run(repo_path, ["for-each-ref", f"--format={_BRANCH_FORMAT}", head_ref.strip()])
+    if not branch:
+        # The branch doesn't exist yet if HEAD is unborn
+        return None
+    return branch.rstrip("\n").split("\0")
+
+
+def _read_refs_git(repo_path: str, name: str, fetch: bool, cache_graph: bool, fetch_stamps: Optional[FetchStamps]) -> Optional[Tuple[str, bool, bool, int, int]]:
+    """
+    Same as `_read_refs()`, but using the Git command-line tool. Returns `None` if Git could not read the repo.
+    """
+    branch_has_upstream = False
+    (local_ahead, local_behind) = (0, 0)
+    # This is the first command, so it also checks that the repo can be read at all
+    remotes = git.run(repo_path, ["remote"])
+    if remotes is None:
+        return None
+    is_local = not remotes
+    branch = _get_current_branch_git(repo_path)
+    if branch is None:
+        commit = git.run(repo_path, ["rev-parse", "--verify", "--quiet", "HEAD"])
+        head_name = f"({commit[:6]})" if commit else "(no commits)"
+    else:
+        (head_name, upstream, remote_name, track) = branch
+        # The upstream branch is "gone" if it is configured but doesn't exist (e.g., because nothing has been fetched yet)
+        if upstream and track != "gone":
+            branch_has_upstream = True
+            if fetch and not (fetch_stamps and fetch_stamps.is_fresh(repo_path)):
+                if git.fetch(repo_path, remote_name):
+                    if fetch_stamps:
+                        fetch_stamps.record(repo_path)
+                    # The upstream reference may have moved
+                    branch = _get_current_branch_git(repo_path) or branch
+                    track = branch[3]
+                else:
+                    output.warn(f"Failed to fetch repo '{name}'")
+            if cache_graph and not git.write_commit_graph(repo_path):
+                output.warn(f"Failed to write commit-graph for repo '{name}'")
+            ahead = _AHEAD_REGEX.search(track)
+            behind = _BEHIND_REGEX.search(track)
+            local_ahead = int(ahead.group(1)) if ahead else 0
+            local_behind = int(behind.group(1)) if behind else 0
+    return (head_name, is_local, branch_has_upstream, local_ahead, local_behind)
+
+
+def _has_changes_git(repo_path: str) -> bool:
+    # This fails for bare repos, which have no working tree and therefore no changes.
+    # Don't take the index lock to refresh the index, since that could make the user's own Git commands fail.
+    # Only check whether there is any output, so there's no need to decode it.
+    changes = git.run_bytes(repo_path, ["--no-optional-locks", "status", "--porcelain=v2", "-z"])
+    return bool(changes)
+
+
+def get_status_git(repo_path: str, name: str, fetch: bool, cache_graph: bool, fetch_stamps: Optional[FetchStamps], check_changes: bool = True) -> Optional[RepoStatus]:
+    """
+    Same as `get_status()`, but using the Git command-line tool instead of libgit2. Returns `None` if Git could not read the repo.
+    """
+    refs = _read_refs_git(repo_path, name, fetch, cache_graph, fetch_stamps)
+    if refs is None:
+        output.warn(f"Failed to load repository '{name}'")
+        return None
+    (head, is_local, branch_has_upstream, local_ahead, local_behind) = refs
+    has_changes = check_changes and _has_changes_git(repo_path)
+    return RepoStatus(name, head, is_local, has_changes, branch_has_upstream, local_ahead, local_behind)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 import os
 import pygit2  # type: ignore
 import re
@@ -29,8 +29,8 @@ class TestCase(unittest.TestCase):
 
     #region Shell commands
 
-    def _run_shell_command(self, args: List[str], ignore_error: bool = False, working_dir: str = ".") -> str:
-        result = subprocess.run(args, capture_output=True, cwd=working_dir)
+    def _run_shell_command(self, args: List[str], ignore_error: bool = False, working_dir: str = ".", env: Optional[Dict[str, str]] = None) -> str:
+        result = subprocess.run(args, capture_output=True, cwd=working_dir, env=env)
         if not ignore_error:
             error_msg = result.stderr.decode()
             if error_msg:
@@ -102,6 +102,12 @@ class TestCase(unittest.TestCase):
         '''
         self._run_shell_command(["git", "remote", "set-url", remote, url])
 
+    def _git_tag(self, name: str) -> None:
+        '''
+        git tag ``name``
+        '''
+        self._run_shell_command(["git", "tag", name])
+
     def _create_file(self, filename: str) -> None:
         '''
         touch ``filename``
@@ -257,6 +263,28 @@ class TestCase(unittest.TestCase):
         self._git_init(dir)
         self._create_file(os.path.join(dir, "hello.txt"))
 
+    def _create_bare_repo(self, dir: str) -> None:
+        if os.path.isdir(dir):
+            print(f"Repo '{dir}' already exists")
+            return
+        print(f"Setting up repo '{dir}'")
+        pygit2.init_repository(dir, bare=True)  # type: ignore
+
+    def _create_repo_with_tag_named_like_branch(self, dir: str) -> None:
+        if os.path.isdir(dir):
+            print(f"Repo '{dir}' already exists")
+            return
+        print(f"Setting up repo '{dir}'")
+        starting_dir = os.getcwd()
+        os.makedirs(dir)
+        self._git_init(dir, "main")
+        os.chdir(dir)
+        self._create_file("hello.txt")
+        self._git_add_all()
+        self._git_commit("Initial commit")
+        self._git_tag("main")
+        os.chdir(starting_dir)
+
     def _make_changes_in_remote(self, dir: str) -> None:
         print(f"Switching to advanced remote in '{dir}'")
         starting_dir = os.getcwd()
@@ -289,14 +317,15 @@ class TestCase(unittest.TestCase):
 
     #endregion
 
-    def run_gitsum(self, args: List[str], working_dir: str = ".") -> str:
+    def run_gitsum(self, args: List[str], working_dir: str = ".", extra_env: Optional[Dict[str, str]] = None) -> str:
         root_path = Path(TestCase._GITSUM_REPO_ROOT)
 
         gitsum_path = str(root_path.joinpath("src/dev_main.py").absolute())
         coverage_path = str(root_path.joinpath(".coverage").absolute())
         command = ["coverage", "run", "--append", "--branch", f"--data-file={coverage_path}", gitsum_path]
 
-        return self._run_shell_command(command + args, working_dir=working_dir)
+        env = {**os.environ, **extra_env} if extra_env else None
+        return self._run_shell_command(command + args, working_dir=working_dir, env=env)
 
     def _make_assert_message(self, actual: str, expected: str) -> str:
         out = "\n" + ("~" * 31) + " OUTPUT " + ("~" * 31) + "\n"
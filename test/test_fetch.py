@@ -1,4 +1,5 @@
 from inspect import cleandoc
+import tempfile
 
 from test.base_test_case import TestCase
 
@@ -19,3 +20,36 @@ class FetchTests(TestCase):
         """)
         actual = self.run_gitsum(["--fetch"], working_dir="test_fetch")
         self.assert_lines_equal(expected, actual)
+
+    def test_fetch_git_backend(self):
+        expected = cleandoc(f"""
+            Found 3 Git repositories.
+               remote/empty      (no commits)     local branch
+            !  remote/not empty  main             <4
+            !  untracked         (no commits)  *  local repo
+        """)
+        actual = self.run_gitsum(["--fetch", "--backend", "git"], working_dir="test_fetch")
+        self.assert_lines_equal(expected, actual)
+
+    def test_fetch_ttl(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = {"XDG_CACHE_HOME": cache_dir}
+            expected = cleandoc(f"""
+                Found 3 Git repositories.
+                   remote/empty      (no commits)     local branch
+                !  remote/not empty  main             <4
+                !  untracked         (no commits)  *  local repo
+            """)
+            actual = self.run_gitsum(["--fetch", "--fetch-ttl", "3600"], working_dir="test_fetch", extra_env=env)
+            self.assert_lines_equal(expected, actual)
+
+            # Forget the fetched commits. Since the repo was just fetched, they should not come back.
+            self._run_shell_command(["git", "update-ref", "refs/remotes/origin/main", "HEAD"], working_dir="test_fetch/remote/not empty")
+            expected = cleandoc(f"""
+                Found 3 Git repositories.
+                   remote/empty      (no commits)     local branch
+                   remote/not empty  main
+                !  untracked         (no commits)  *  local repo
+            """)
+            actual = self.run_gitsum(["--fetch", "--fetch-ttl", "3600"], working_dir="test_fetch", extra_env=env)
+            self.assert_lines_equal(expected, actual)
@@ -6,13 +6,28 @@ from test.base_test_case import TestCase
 class HelpTests(TestCase):
     def test_help(self):
         expected = cleandoc(f"""
-            usage: gitsum [-h] [-f] [-o] [-O] [-V]
+            usage: gitsum [-h] [--backend {{libgit2,git}}] [--cache-graph] [-e NAME]
+                          [--fast] [-f] [--fetch-ttl SECONDS] [-j N] [-o] [-O] [-V]
 
             View a summary of statuses for multiple Git repositories.
 
             ^(?:options|optional arguments):$
               -h, --help            show this help message and exit
+              --backend {{libgit2,git}}
+                                    how to read the repositories: with libgit2 (default)
+                                    or by running git
+              --cache-graph         write a commit-graph file in each repository to speed
+                                    up future runs (requires git)
+              -e NAME, --exclude NAME
+                                    do not search directories with the given name (can be
+                                    used multiple times)
+              --fast                do not check for local changes (only show the status
+                                    relative to the upstream branch)
               -f, --fetch           fetch before getting status
+              --fetch-ttl SECONDS   when fetching, skip repositories that were fetched
+                                    less than SECONDS ago (default: 0)
+              -j N, --jobs N        number of repositories to process in parallel
+                                    (default: based on the number of CPUs)
               -o, --outside-files   list files and directories that are not inside a Git
                                     repository
               -O, --only-outside-files
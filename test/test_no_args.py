@@ -11,34 +11,112 @@ class NoArgsTests(TestCase):
         self._modified_repo_commit_hash: str
 
     def _set_up_repos(self) -> None:
+        self._create_bare_repo("test_no_args/bare")
         self._create_repo_with_deleted_file("test_no_args/deleted")
         self._create_repo_with_modified_file("test_no_args/modified")
         self._clone_empty_repo("test_no_args/remote/empty")
         os.makedirs("test_no_args/remote/empty/subfolder", exist_ok=True)
         self._clone_repo_ahead_behind("test_no_args/remote/not empty/ahead behind")
         self._clone_repo_with_staged_changes("test_no_args/remote/not empty/staged")
+        self._create_repo_with_tag_named_like_branch("test_no_args/tagged")
         self._create_repo_with_merge_conflicts("test_no_args/unmerged")
         self._create_repo_with_untracked_files("test_no_args/untracked")
         os.makedirs("test_no_args/not a repo", exist_ok=True)
 
         # Get modified repo commit hash
         repo = pygit2.Repository("test_no_args/modified")
-        self._modified_repo_commit_hash = repo.head.target.hex[:6]  # type: ignore
+        self._modified_repo_commit_hash = str(repo.head.target)[:6]
 
     def test_no_args(self):
         expected = cleandoc(f"""
-            Found 7 Git repositories.
+            Found 9 Git repositories.
+               bare                           (no commits)     local repo
             !  deleted                        master        *  local repo
             !  modified                       ({self._modified_repo_commit_hash})      *  local repo
                remote/empty                   (no commits)     local branch
             !  remote/not empty/ahead behind  main             >1 <3
             !  remote/not empty/staged        feature       *
+               tagged                         main             local repo
             !  unmerged                       main          *  local repo
             !  untracked                      (no commits)  *  local repo
         """)
         actual = self.run_gitsum([], working_dir="test_no_args")
         self.assert_lines_equal(expected, actual)
 
+    def test_single_job(self):
+        expected = cleandoc(f"""
+            Found 9 Git repositories.
+               bare                           (no commits)     local repo
+            !  deleted                        master        *  local repo
+            !  modified                       ({self._modified_repo_commit_hash})      *  local repo
+               remote/empty                   (no commits)     local branch
+            !  remote/not empty/ahead behind  main             >1 <3
+            !  remote/not empty/staged        feature       *
+               tagged                         main             local repo
+            !  unmerged                       main          *  local repo
+            !  untracked                      (no commits)  *  local repo
+        """)
+        actual = self.run_gitsum(["--jobs", "1"], working_dir="test_no_args")
+        self.assert_lines_equal(expected, actual)
+
+    def test_fast(self):
+        expected = cleandoc(f"""
+            Found 9 Git repositories.
+               bare                           (no commits)     local repo
+               deleted                        master           local repo
+               modified                       ({self._modified_repo_commit_hash})         local repo
+               remote/empty                   (no commits)     local branch
+            !  remote/not empty/ahead behind  main             >1 <3
+               remote/not empty/staged        feature
+               tagged                         main             local repo
+               unmerged                       main             local repo
+               untracked                      (no commits)     local repo
+        """)
+        actual = self.run_gitsum(["--fast"], working_dir="test_no_args")
+        self.assert_lines_equal(expected, actual)
+
+    def test_git_backend(self):
+        expected = cleandoc(f"""
+            Found 9 Git repositories.
+               bare                           (no commits)     local repo
+            !  deleted                        master        *  local repo
+            !  modified                       ({self._modified_repo_commit_hash})      *  local repo
+               remote/empty                   (no commits)     local branch
+            !  remote/not empty/ahead behind  main             >1 <3
+            !  remote/not empty/staged        feature       *
+               tagged                         main             local repo
+            !  unmerged                       main          *  local repo
+            !  untracked                      (no commits)  *  local repo
+        """)
+        actual = self.run_gitsum(["--backend", "git"], working_dir="test_no_args")
+        self.assert_lines_equal(expected, actual)
+
+    def test_cache_graph(self):
+        expected = cleandoc(f"""
+            Found 9 Git repositories.
+               bare                           (no commits)     local repo
+            !  deleted                        master        *  local repo
+            !  modified                       ({self._modified_repo_commit_hash})      *  local repo
+               remote/empty                   (no commits)     local branch
+            !  remote/not empty/ahead behind  main             >1 <3
+            !  remote/not empty/staged        feature       *
+               tagged                         main             local repo
+            !  unmerged                       main          *  local repo
+            !  untracked                      (no commits)  *  local repo
+        """)
+        actual = self.run_gitsum(["--cache-graph"], working_dir="test_no_args")
+        self.assert_lines_equal(expected, actual)
+        commit_graph = "test_no_args/remote/not empty/ahead behind/.git/objects/info/commit-graphs/commit-graph-chain"
+        self.assertTrue(os.path.isfile(commit_graph))
+
+    def test_outside_files(self):
+        # The bare repo's contents should not be listed as outside files
+        expected = cleandoc("""
+            OUTSIDE: not a repo/
+        """)
+        actual = self.run_gitsum(["--only-outside-files"], working_dir="test_no_args")
+        self.assert_lines_equal(expected, actual)
+
     def test_no_repos(self):
         expected = "Found 0 Git repositories."
         actual = self.run_gitsum([], working_dir="test_no_args/not a repo")
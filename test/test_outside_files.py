@@ -19,19 +19,25 @@ class OutsideFileTests(TestCase):
         self._create_file("test_outside_files/foo/all-outside/nested-outside/general-kenobi.txt")
         os.makedirs("test_outside_files/foo/empty-outside", exist_ok=True)
         self._create_file("test_outside_files/foo/outside.txt")
+        # Excluded directories should not be searched
+        self._create_repo_with_untracked_files("test_outside_files/node_modules/untracked")
+        # Vendored dependencies can be repos, so vendor/ should be searched
+        self._create_repo_with_deleted_file("test_outside_files/vendor/lib")
 
     _EXPECTED_FILES = cleandoc("""
         OUTSIDE: all-outside/
         OUTSIDE: foo/all-outside/
         OUTSIDE: foo/empty-outside/
         OUTSIDE: foo/outside.txt
+        OUTSIDE: node_modules/
         OUTSIDE: outside.txt
     """)
 
     _EXPECTED_REPOS = cleandoc("""
-        Found 2 Git repositories.
+        Found 3 Git repositories.
         !  deleted        master        *  local repo
         !  foo/untracked  (no commits)  *  local repo
+        !  vendor/lib     master        *  local repo
     """)
 
     _EXPECTED_COMBINED = _EXPECTED_FILES + "\n" + _EXPECTED_REPOS
@@ -44,6 +50,19 @@ class OutsideFileTests(TestCase):
         actual = self.run_gitsum(["--only-outside-files"], working_dir="test_outside_files")
         self.assert_lines_equal(self._EXPECTED_FILES, actual)
 
+    def test_exclude(self) -> None:
+        expected = cleandoc("""
+            OUTSIDE: all-outside/
+            OUTSIDE: foo/
+            OUTSIDE: node_modules/
+            OUTSIDE: outside.txt
+            Found 2 Git repositories.
+            !  deleted     master  *  local repo
+            !  vendor/lib  master  *  local repo
+        """)
+        actual = self.run_gitsum(["--outside-files", "--exclude", "foo"], working_dir="test_outside_files")
+        self.assert_lines_equal(expected, actual)
+
     def test_no_outside_files(self) -> None:
         actual = self.run_gitsum(["--only-outside-files"], working_dir="test_outside_files/deleted")
         self.assertEqual("", actual)